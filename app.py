@@ -6,8 +6,12 @@ import requests
 import json
 import uuid
 import threading
-import decimal
 from flask import Flask, request, jsonify
+from sharding import ShardRouter, load_accounts, validate_shard_config
+from quantizer import (
+    DEFAULT_QUANTIZER, get_precision_from_step, build_quantizer, get_tick_quantizer,
+    quantize_qty_str, price_strs,
+)
 import traceback
 
 app = Flask(__name__)
@@ -16,6 +20,15 @@ API_KEY = os.environ.get('BYBIT_API_KEY')
 API_SECRET = os.environ.get('BYBIT_API_SECRET')
 BASE_URL = 'https://api.bybit.com'
 
+# 샤딩: 계정별 워커 프로세스 수 (0이면 기존처럼 Flask 프로세스에서 직접 주문 처리)
+SHARD_WORKERS_PER_ACCOUNT = int(os.environ.get('SHARD_WORKERS_PER_ACCOUNT', '0'))
+
+ACCOUNTS = load_accounts(os.environ.get('BYBIT_ACCOUNTS'), API_KEY, API_SECRET)
+ACCOUNTS_BY_NAME = {a['name']: a for a in ACCOUNTS}
+validate_shard_config(ACCOUNTS, SHARD_WORKERS_PER_ACCOUNT)
+API_KEY = ACCOUNTS[0]['api_key']
+API_SECRET = ACCOUNTS[0]['api_secret']
+
 TRADE_LEVERAGE = 10
 MY_RISK_RATIO = 0.10
 TRADE_MARGIN_MODE = 'ISOLATED'
@@ -51,14 +64,8 @@ SYMBOL_POLICY = {
     }
 }
 
-def get_precision_from_step(step):
-    try:
-        if float(step) == 1:
-            return 0
-        else:
-            return abs(decimal.Decimal(str(step)).as_tuple().exponent)
-    except Exception:
-        return 0
+def get_quantizer(symbol):
+    return SYMBOL_QUANTIZER.get(get_underlying_symbol(symbol), DEFAULT_QUANTIZER)
 
 def get_symbol_policy(symbol):
     base_symbol = get_underlying_symbol(symbol)
@@ -84,14 +91,16 @@ def update_symbol_meta():
                 max_qty = float(lot['maxOrderQty'])
                 max_mkt_qty = float(lot.get('maxMktOrderQty', max_qty))
                 contract_size = float(item.get('contractSize', 1.0))
-                precision = abs(decimal.Decimal(str(step)).as_tuple().exponent)
+                precision = get_precision_from_step(step)
+                tick_size = float(item.get('priceFilter', {}).get('tickSize', 0.01))
                 meta[sym] = {
                     "step_size": step,
                     "precision": precision,
                     "min_qty": min_qty,
                     "max_qty": max_qty,
                     "max_mkt_qty": max_mkt_qty,
-                    "contract_size": contract_size
+                    "contract_size": contract_size,
+                    "tick_size": tick_size
                 }
         return meta
     except Exception as e:
@@ -99,15 +108,14 @@ def update_symbol_meta():
         return {}
 
 def refresh_symbol_meta():
-    global SYMBOL_META, SYMBOL_PRECISION, SYMBOL_STEP_SIZE, SYMBOL_MIN_QTY, SYMBOL_MAX_QTY, SYMBOL_MAX_MKT_QTY, SYMBOL_CONTRACT_SIZE, SYMBOL_TICK_SIZE
+    global SYMBOL_META, SYMBOL_CONTRACT_SIZE, SYMBOL_TICK_SIZE, SYMBOL_QUANTIZER
     SYMBOL_META = update_symbol_meta()
-    SYMBOL_PRECISION = {k: v["precision"] for k, v in SYMBOL_META.items()}
-    SYMBOL_STEP_SIZE = {k: v["step_size"] for k, v in SYMBOL_META.items()}
-    SYMBOL_MIN_QTY   = {k: v["min_qty"] for k, v in SYMBOL_META.items()}
-    SYMBOL_MAX_QTY   = {k: v["max_qty"] for k, v in SYMBOL_META.items()}
-    SYMBOL_MAX_MKT_QTY = {k: v["max_mkt_qty"] for k, v in SYMBOL_META.items()}
     SYMBOL_CONTRACT_SIZE = {k: v["contract_size"] for k, v in SYMBOL_META.items()}
-    SYMBOL_TICK_SIZE = {k: v.get("step_size", 0.01) for k, v in SYMBOL_META.items()}
+    SYMBOL_TICK_SIZE = {k: v.get("tick_size", 0.01) for k, v in SYMBOL_META.items()}
+    SYMBOL_QUANTIZER = {
+        k: build_quantizer(v["step_size"], v["min_qty"], v["max_qty"], v["max_mkt_qty"], v["tick_size"])
+        for k, v in SYMBOL_META.items()
+    }
 
 def get_underlying_symbol(symbol):
     return symbol.replace('.P', '')
@@ -119,6 +127,15 @@ def generate_signature(timestamp, api_key, recv_window, body, api_secret):
     pre_hash = str(timestamp) + api_key + str(recv_window) + body
     return hmac.new(api_secret.encode('utf-8'), pre_hash.encode('utf-8'), hashlib.sha256).hexdigest()
 
+# requests.Session 은 스레드 안전이 보장되지 않으므로 스레드마다 커넥션풀을 따로 둠
+HTTP_LOCAL = threading.local()
+
+def get_http_session():
+    session = getattr(HTTP_LOCAL, 'session', None)
+    if session is None:
+        session = HTTP_LOCAL.session = requests.Session()
+    return session
+
 def http_request(method, endpoint, body_dict):
     timestamp = get_timestamp()
     recv_window = 5000
@@ -139,9 +156,9 @@ def http_request(method, endpoint, body_dict):
     url = BASE_URL + endpoint
     try:
         if method == "GET":
-            resp = requests.get(url, headers=headers, params=body_dict)
+            resp = get_http_session().get(url, headers=headers, params=body_dict)
         else:
-            resp = requests.post(url, headers=headers, data=sign_body)
+            resp = get_http_session().post(url, headers=headers, data=sign_body)
         print(f"[HTTP] {method} {url} params/body: {body_dict} --> status:{resp.status_code}", flush=True)
         print(f"[HTTP] Response: {resp.text}", flush=True)
         return resp
@@ -223,33 +240,9 @@ def get_position_entry_price(symbol, position_idx):
 def has_open_position(symbol, position_idx):
     return get_position_size(symbol, position_idx) > 0
 
-def adjust_qty(symbol, qty, order_type="Market"):
-    symbol = get_underlying_symbol(symbol)
-    step = SYMBOL_STEP_SIZE.get(symbol, 1)
-    precision = SYMBOL_PRECISION.get(symbol, 0)
-    min_qty = SYMBOL_MIN_QTY.get(symbol, 1)
-    if order_type == "Market":
-        max_qty = SYMBOL_MAX_MKT_QTY.get(symbol, 71000)
-    else:
-        max_qty = SYMBOL_MAX_QTY.get(symbol, 710000)
-    qty = max(qty, min_qty)
-    qty = min(qty, max_qty)
-    if precision == 0:
-        qty = int(qty // step * step)
-    else:
-        qty = round((qty // step) * step, precision)
-    qty = max(min_qty, min(qty, max_qty))
-    if precision == 0:
-        qty = int(qty)
-    return qty
-
-def get_qty_str(symbol, qty):
-    precision = SYMBOL_PRECISION.get(symbol, 0)
-    if precision == 0:
-        return str(int(round(qty)))
-    else:
-        fmt = f"{{:.{precision}f}}"
-        return fmt.format(qty)
+def get_qty_str(symbol, qty, order_type="Market"):
+    q = SYMBOL_QUANTIZER.get(get_underlying_symbol(symbol), DEFAULT_QUANTIZER)
+    return quantize_qty_str(q, qty, order_type)
 
 def get_order_qty(symbol, order_type="Market"):
     meta_symbol = get_underlying_symbol(symbol)
@@ -267,21 +260,15 @@ def get_order_qty(symbol, order_type="Market"):
 
     my_balance = get_my_balance()
     contract_size = SYMBOL_CONTRACT_SIZE.get(meta_symbol, 1.0)
-    if order_type == "Market":
-        max_qty = SYMBOL_MAX_MKT_QTY.get(meta_symbol, 71000)
-    else:
-        max_qty = SYMBOL_MAX_QTY.get(meta_symbol, 710000)
     if price and my_balance:
         available_usdt = my_balance * TRADE_LEVERAGE * MY_RISK_RATIO
         raw_qty = available_usdt / (price * contract_size)
-        qty = adjust_qty(meta_symbol, raw_qty, order_type)
     else:
-        precision = SYMBOL_PRECISION.get(meta_symbol, 3)
-        qty = 1 if precision == 0 else round(1.0, precision)
-    if qty > max_qty:
-        qty = max_qty
-    print(f"[주문수량 계산] price:{price}, balance:{my_balance}, qty:{qty}", flush=True)
-    return qty
+        raw_qty = 1.0
+    # 스텝 내림 + Market/Limit 최대수량 제한까지 한번에 처리한 주문용 문자열
+    qty_str = get_qty_str(meta_symbol, raw_qty, order_type)
+    print(f"[주문수량 계산] price:{price}, balance:{my_balance}, qty:{qty_str}", flush=True)
+    return qty_str
 
 def close_position_and_wait(symbol, close_side, max_retry=3, wait_sec=5):
     symbol = get_underlying_symbol(symbol)
@@ -323,20 +310,6 @@ def wait_until_position_open(symbol, position_idx, timeout=10, interval=0.5):
         time.sleep(interval)
     return 0
 
-def round_to_tick(price, tick):
-    decimals = abs(decimal.Decimal(str(tick)).as_tuple().exponent)
-    return float(round(price / tick) * tick)
-
-def enforce_min_tick_gap(entry, tgt, tick, min_gap=20):
-    gap = abs(tgt - entry)
-    min_dist = tick * min_gap
-    if gap < min_dist:
-        if tgt > entry:
-            tgt = entry + min_dist
-        else:
-            tgt = entry - min_dist
-    return round_to_tick(tgt, tick)
-
 def get_tp_sl_by_real_pnl(entry_price, position_idx, lev, tp_pnl=TP_PROFIT_RATE, sl_pnl=SL_LOSS_RATE, commission=COMMISSION):
     if position_idx == 1:  # 롱
         tp = entry_price * (1 + (tp_pnl + commission) / lev)
@@ -352,10 +325,11 @@ def set_trading_stop(symbol, position_idx, tp_price, sl_price):
         "symbol": symbol,
         "positionIdx": position_idx,
     }
+    q = get_quantizer(symbol)
     if tp_price:
-        body["takeProfit"] = str(tp_price)
+        body["takeProfit"] = tp_price if isinstance(tp_price, str) else price_strs(q, [tp_price])[0]
     if sl_price:
-        body["stopLoss"] = str(sl_price)
+        body["stopLoss"] = sl_price if isinstance(sl_price, str) else price_strs(q, [sl_price])[0]
     resp = http_request("POST", "/v5/position/trading-stop", body)
     print(f"[TRADING-STOP] set TP/SL: {body}", flush=True)
     print("[TRADING-STOP 응답]", resp.text, flush=True)
@@ -402,9 +376,8 @@ def cancel_order(symbol, order_id):
 
 def place_tp_sl_orders(symbol, qty, tp_price, sl_price, position_idx, entry_price, tick, tp_order_id, sl_order_id):
     side = 'Sell' if position_idx == 1 else 'Buy'
-    tp_price_rounded = round_to_tick(tp_price, tick)
-    sl_price_rounded = round_to_tick(sl_price, tick)
-    qty_str = get_qty_str(symbol, qty)
+    tp_price_rounded, sl_price_rounded = price_strs(get_tick_quantizer(tick), [tp_price, sl_price])
+    qty_str = get_qty_str(symbol, qty, order_type="Limit")
     print(f"[TP/SL 주문발행] side: {side}, qty: {qty_str}, TP: {tp_price_rounded}, SL: {sl_price_rounded}", flush=True)
     tp_body = {
         'category': 'linear',
@@ -412,7 +385,7 @@ def place_tp_sl_orders(symbol, qty, tp_price, sl_price, position_idx, entry_pric
         'side': side,
         'orderType': 'Limit',
         'qty': qty_str,
-        'price': str(tp_price_rounded),
+        'price': tp_price_rounded,
         'timeInForce': 'GoodTillCancel',
         'reduceOnly': True,
         'orderLinkId': tp_order_id,
@@ -426,7 +399,7 @@ def place_tp_sl_orders(symbol, qty, tp_price, sl_price, position_idx, entry_pric
         'side': side,
         'orderType': 'Limit',
         'qty': qty_str,
-        'price': str(sl_price_rounded),
+        'price': sl_price_rounded,
         'timeInForce': 'GoodTillCancel',
         'reduceOnly': True,
         'orderLinkId': sl_order_id,
@@ -452,14 +425,15 @@ def monitor_and_cleanup(symbol, position_idx, tp_order_id, sl_order_id):
             break
         time.sleep(1)
 
-def monitor_trailing_stop(symbol, position_idx, entry_price, lev, policy):
+def monitor_trailing_stop(symbol, position_idx, entry_price, lev, policy, current_sl=None):
     steps = policy.get('trailing_steps', None)
     commission = COMMISSION
     if not steps:
         return
 
-    step_idx = 0
+    q = get_quantizer(symbol)
     triggered = set()
+    sl_entry, sl_prices = None, None
     while True:
         size = get_position_size(symbol, position_idx)
         if size == 0:
@@ -479,14 +453,25 @@ def monitor_trailing_stop(symbol, position_idx, entry_price, lev, policy):
                         direction = 1 if position_idx == 1 else -1
                         pnl_rate = direction * (last_price - entry) / entry * lev
 
+                        # 진입가가 바뀔 때만 단계별 SL 가격을 한번에 양자화
+                        if entry != sl_entry:
+                            if position_idx == 1:  # 롱
+                                raw_sls = [entry * (1 + (s['sl'] - commission) / lev) for s in steps]
+                            else:
+                                raw_sls = [entry * (1 - (s['sl'] + commission) / lev) for s in steps]
+                            sl_entry, sl_prices = entry, price_strs(q, raw_sls)
+                            if current_sl:
+                                # 모니터 재연결시: 현재 SL 보다 느슨한 단계는 이미 적용된 것으로 보고 건너뜀 (SL 후퇴 방지)
+                                for i, p in enumerate(sl_prices):
+                                    if (float(p) <= current_sl) if position_idx == 1 else (float(p) >= current_sl):
+                                        triggered.add(i)
+                                current_sl = None
+
                         for i, s in enumerate(steps):
                             trigger = s['trigger']
                             trail_sl = s['sl']
                             if i not in triggered and pnl_rate >= trigger:
-                                if position_idx == 1:  # 롱
-                                    new_sl = entry * (1 + (trail_sl - commission) / lev)
-                                else:
-                                    new_sl = entry * (1 - (trail_sl + commission) / lev)
+                                new_sl = sl_prices[i]
                                 set_trading_stop(symbol, position_idx, "", new_sl)
                                 print(f"[트레일링스탑 {i+1}회차 적용] {symbol} SL → {trail_sl*100:.2f}% (실행가: {new_sl})", flush=True)
                                 triggered.add(i)
@@ -494,14 +479,60 @@ def monitor_trailing_stop(symbol, position_idx, entry_price, lev, policy):
             print("[트레일링스탑 오류]", flush=True)
         time.sleep(1)
 
+def get_open_positions():
+    endpoint = '/v5/position/list'
+    positions = []
+    cursor = ''
+    while True:
+        body = {"category": "linear", "settleCoin": "USDT", "limit": 200}
+        if cursor:
+            body['cursor'] = cursor
+        resp = http_request('GET', endpoint, body)
+        try:
+            data = resp.json()
+            if data.get('retCode') != 0:
+                break
+            for pos in data['result']['list']:
+                if float(pos.get('size') or 0) > 0:
+                    positions.append(pos)
+            cursor = data['result'].get('nextPageCursor')
+        except Exception:
+            print("[오픈 포지션 조회 실패]", flush=True)
+            break
+        if not cursor:
+            break
+    return positions
+
+def resume_position_monitors(owns_symbol=None):
+    # 워커 (재)시작시 이미 열린 포지션의 트레일링스탑/청산정리 모니터를 다시 붙임
+    for pos in get_open_positions():
+        symbol = pos['symbol']
+        position_idx = int(pos.get('positionIdx', 0))
+        if position_idx not in (1, 2) or (owns_symbol is not None and not owns_symbol(symbol)):
+            continue
+        close_side = 'Sell' if position_idx == 1 else 'Buy'
+        link_ids = [o.get('orderLinkId') or '' for o in get_open_orders(symbol) if o.get('side') == close_side]
+        tp_order_id = next((l for l in link_ids if l.startswith('tp_')), None)
+        sl_order_id = next((l for l in link_ids if l.startswith('sl_')), None)
+        entry_price = float(pos.get('avgPrice') or 0)
+        policy = get_symbol_policy(symbol)
+        if policy.get('trailing_steps') and entry_price > 0:
+            current_sl = float(pos.get('stopLoss') or 0) or None
+            threading.Thread(
+                target=monitor_trailing_stop,
+                args=(symbol, position_idx, entry_price, TRADE_LEVERAGE, policy, current_sl),
+                daemon=True
+            ).start()
+        threading.Thread(target=monitor_and_cleanup, args=(symbol, position_idx, tp_order_id, sl_order_id), daemon=True).start()
+        print(f"[모니터 재연결] {symbol} idx:{position_idx} 진입가:{entry_price} SL:{pos.get('stopLoss')} TP주문:{tp_order_id} SL주문:{sl_order_id}", flush=True)
+
 def place_order(signal, symbol, req_json):
     try:
         bybit_symbol = get_underlying_symbol(symbol)
-        qty = get_order_qty(bybit_symbol, order_type="Market")
-        if qty is None or qty == 0:
+        qty_str = get_order_qty(bybit_symbol, order_type="Market")
+        if not qty_str or float(qty_str) == 0:
             print("[ERROR] 주문수량 0, 진입 스킵", flush=True)
             return {'error': 'Order qty 0, skip'}
-        qty_str = get_qty_str(bybit_symbol, qty)
         client_order_id = f"entry_{uuid.uuid4().hex}"
         qty_for_api = qty_str
 
@@ -647,6 +678,26 @@ def place_order(signal, symbol, req_json):
         print("[place_order ERROR]", traceback.format_exc(), flush=True)
         return {'error': str(e)}
 
+def init_shard_worker(account, owns_symbol):
+    # 워커 프로세스 시작시: 이 워커의 계정 키로 바꾸고 담당 심볼의 열린 포지션 모니터를 복구
+    global API_KEY, API_SECRET
+    API_KEY = account['api_key']
+    API_SECRET = account['api_secret']
+    resume_position_monitors(owns_symbol)
+
+SHARD_ROUTER = None
+SHARD_ROUTER_LOCK = threading.Lock()
+
+def get_shard_router():
+    global SHARD_ROUTER
+    with SHARD_ROUTER_LOCK:
+        if SHARD_ROUTER is None:
+            SHARD_ROUTER = ShardRouter(
+                ACCOUNTS, SHARD_WORKERS_PER_ACCOUNT, place_order,
+                init=init_shard_worker, key_func=get_underlying_symbol
+            ).start()
+    return SHARD_ROUTER
+
 @app.route('/webhook', methods=['POST'])
 def webhook():
     try:
@@ -666,9 +717,19 @@ def webhook():
         if not signal or not symbol:
             print("Invalid signal or symbol", flush=True)
             return jsonify({'error': 'Invalid signal or symbol'}), 400
-        print(f"[WEBHOOK] signal:{signal}, symbol:{symbol}, data:{data}", flush=True)
-        result = place_order(signal, symbol, data)
-        status_code = 200 if 'message' in result else 500
+        account = data.get('account') or ACCOUNTS[0]['name']
+        if account not in ACCOUNTS_BY_NAME:
+            print(f"Unknown account: {account}", flush=True)
+            return jsonify({'error': f'Unknown account: {account}'}), 400
+        print(f"[WEBHOOK] account:{account}, signal:{signal}, symbol:{symbol}, data:{data}", flush=True)
+        if SHARD_WORKERS_PER_ACCOUNT > 0:
+            result = get_shard_router().dispatch(account, signal, symbol, data)
+        else:
+            result = place_order(signal, symbol, data)
+        if isinstance(result, dict) and result.get('status') == 'pending':
+            status_code = 202
+        else:
+            status_code = 200 if 'message' in result else 500
         print("place_order result:", result, flush=True)
         return jsonify(result), status_code
     except Exception as e:
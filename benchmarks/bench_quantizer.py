@@ -0,0 +1,119 @@
+# 수량/가격 양자화 마이크로벤치마크: 앱이 실제로 호출하는 경로 기준, 이전 헬퍼 vs quantizer
+# 실행: python benchmarks/bench_quantizer.py
+import decimal
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quantizer import DEFAULT_QUANTIZER, build_quantizer, get_tick_quantizer, quantize_qty_str, qty_strs, price_strs
+
+SYMBOL = 'ETHUSDT'
+STEP, PRECISION, MIN_QTY, MAX_QTY, MAX_MKT_QTY, TICK = 0.01, 2, 0.01, 1000000.0, 100000.0, 0.01
+N = 10000
+REPEAT = 5
+
+# 이전 app.py 의 심볼별 메타 딕셔너리
+SYMBOL_STEP_SIZE = {SYMBOL: STEP}
+SYMBOL_PRECISION = {SYMBOL: PRECISION}
+SYMBOL_MIN_QTY = {SYMBOL: MIN_QTY}
+SYMBOL_MAX_QTY = {SYMBOL: MAX_QTY}
+SYMBOL_MAX_MKT_QTY = {SYMBOL: MAX_MKT_QTY}
+SYMBOL_QUANTIZER = {SYMBOL: build_quantizer(STEP, MIN_QTY, MAX_QTY, MAX_MKT_QTY, TICK)}
+
+
+def get_underlying_symbol(symbol):
+    return symbol.replace('.P', '')
+
+
+# 이전 app.py 구현 (비교용)
+def legacy_adjust_qty(symbol, qty, order_type="Market"):
+    symbol = get_underlying_symbol(symbol)
+    step = SYMBOL_STEP_SIZE.get(symbol, 1)
+    precision = SYMBOL_PRECISION.get(symbol, 0)
+    min_qty = SYMBOL_MIN_QTY.get(symbol, 1)
+    if order_type == "Market":
+        max_qty = SYMBOL_MAX_MKT_QTY.get(symbol, 71000)
+    else:
+        max_qty = SYMBOL_MAX_QTY.get(symbol, 710000)
+    qty = max(qty, min_qty)
+    qty = min(qty, max_qty)
+    if precision == 0:
+        qty = int(qty // step * step)
+    else:
+        qty = round((qty // step) * step, precision)
+    qty = max(min_qty, min(qty, max_qty))
+    if precision == 0:
+        qty = int(qty)
+    return qty
+
+def legacy_get_qty_str(symbol, qty):
+    precision = SYMBOL_PRECISION.get(symbol, 0)
+    if precision == 0:
+        return str(int(round(qty)))
+    else:
+        fmt = f"{{:.{precision}f}}"
+        return fmt.format(qty)
+
+def legacy_order_qty_str(symbol, raw_qty, order_type="Market"):
+    # get_order_qty (adjust_qty + max 재확인) → place_order 의 get_qty_str
+    qty = legacy_adjust_qty(symbol, raw_qty, order_type)
+    max_qty = SYMBOL_MAX_MKT_QTY.get(symbol, 71000) if order_type == "Market" else SYMBOL_MAX_QTY.get(symbol, 710000)
+    if qty > max_qty:
+        qty = max_qty
+    return legacy_get_qty_str(symbol, qty)
+
+def legacy_round_to_tick(price, tick):
+    # 기존 구현 그대로: 쓰지 않는 decimals 계산 비용까지 포함해 측정
+    decimals = abs(decimal.Decimal(str(tick)).as_tuple().exponent)
+    return float(round(price / tick) * tick)
+
+
+# 현재 app.py 구현과 같은 호출 경로
+def get_quantizer(symbol):
+    return SYMBOL_QUANTIZER.get(get_underlying_symbol(symbol), DEFAULT_QUANTIZER)
+
+def get_qty_str(symbol, qty, order_type="Market"):
+    q = SYMBOL_QUANTIZER.get(get_underlying_symbol(symbol), DEFAULT_QUANTIZER)
+    return quantize_qty_str(q, qty, order_type)
+
+
+def best(fn):
+    return min(timeit.repeat(fn, number=1, repeat=REPEAT)) / N * 1e9
+
+
+def main():
+    rng = random.Random(0)
+    raw_qtys = [rng.uniform(0, 10000) for _ in range(N)]
+    sizes = [float(decimal.Decimal('0.01') * rng.randint(1, 10 ** 6)) for _ in range(N)]
+    prices = [rng.uniform(0, 100000) for _ in range(N)]
+    q = SYMBOL_QUANTIZER[SYMBOL]
+
+    rows = [
+        ('entry qty: legacy get_order_qty+get_qty_str',
+         best(lambda: [legacy_order_qty_str(SYMBOL, x) for x in raw_qtys])),
+        ('entry qty: get_qty_str (1 quantization)',
+         best(lambda: [get_qty_str(SYMBOL, x) for x in raw_qtys])),
+        ('close qty: legacy get_qty_str(position size)',
+         best(lambda: [legacy_get_qty_str(SYMBOL, x) for x in sizes])),
+        ('close qty: get_qty_str(position size)',
+         best(lambda: [get_qty_str(SYMBOL, x) for x in sizes])),
+        ('tp/sl price: legacy str(round_to_tick)',
+         best(lambda: [str(legacy_round_to_tick(p, TICK)) for p in prices])),
+        ('tp/sl price: price_strs(get_tick_quantizer, [p])',
+         best(lambda: [price_strs(get_tick_quantizer(TICK), [p])[0] for p in prices])),
+        ('batch qty: qty_strs', best(lambda: qty_strs(q, raw_qtys))),
+        ('batch price: price_strs', best(lambda: price_strs(q, prices))),
+    ]
+    for name, ns in rows:
+        print(f"{name:50s} {ns:8.1f} ns/item")
+
+    on_step = [float(decimal.Decimal('0.01') * k) for k in range(1, N + 1)]
+    off_by_step = sum(1 for x in on_step if legacy_order_qty_str(SYMBOL, x) != get_qty_str(SYMBOL, x))
+    print(f"on-step qtys the legacy path floors one step too low: {off_by_step}/{N}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# 샤드 워커 수에 따른 처리량 측정: 1 워커 vs N 워커
+# 실행: python benchmarks/bench_sharding.py [최대 워커 수]
+import hashlib
+import hmac
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sharding import ShardRouter
+
+ACCOUNT = {'name': 'bench', 'api_key': 'k', 'api_secret': 's'}
+SYMBOLS = [f"SYM{i}USDT" for i in range(64)]
+JOBS_PER_SYMBOL = 4
+
+
+# 주문 1건 대역: 서명/직렬화 같은 CPU 작업(HMAC cpu_iters 회, 시간 기준이 아니라 고정 작업량) + 거래소 왕복 대기(io_ms)
+def bench_handler(signal, symbol, data):
+    digest = b''
+    for _ in range(data['cpu_iters']):
+        digest = hmac.new(b'secret', digest + symbol.encode(), hashlib.sha256).digest()
+    time.sleep(data['io_ms'] / 1000)
+    return {'message': 'ok'}
+
+
+def iters_for_ms(ms):
+    n = 20000
+    started = time.perf_counter()
+    bench_handler('calibrate', 'SYM', {'cpu_iters': n, 'io_ms': 0})
+    return max(1, int(n * ms / 1000 / (time.perf_counter() - started)))
+
+
+def run(workers, cpu_iters, io_ms):
+    router = ShardRouter([ACCOUNT], workers, bench_handler).start()
+    try:
+        for sym in SYMBOLS:  # 워커 기동 + 심볼별 소비 스레드 생성은 측정에서 제외
+            router.dispatch('bench', 'warmup', sym, {'cpu_iters': 0, 'io_ms': 0})
+        started = time.perf_counter()
+        jobs = [
+            router.submit('bench', 'buy', sym, {'cpu_iters': cpu_iters, 'io_ms': io_ms})
+            for _ in range(JOBS_PER_SYMBOL)
+            for sym in SYMBOLS
+        ]
+        for job in jobs:
+            router.wait(job)
+        return len(jobs) / (time.perf_counter() - started)
+    finally:
+        router.stop()
+
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else max(2, os.cpu_count() or 1)
+    counts = sorted({1, 2, max_workers})
+    print(f"cpu_count={os.cpu_count()}, {len(SYMBOLS)} symbols x {JOBS_PER_SYMBOL} jobs")
+    for label, cpu_ms, io_ms in (('cpu-bound  (5ms cpu)', 5, 0), ('io-bound   (50ms io)', 0, 50), ('mixed (2ms cpu+20ms io)', 2, 20)):
+        base = None
+        cpu_iters = iters_for_ms(cpu_ms) if cpu_ms else 0
+        for workers in counts:
+            rate = run(workers, cpu_iters, io_ms)
+            base = base or rate
+            print(f"{label:26s} workers={workers:<3d} {rate:8.1f} jobs/s  x{rate / base:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+import decimal
+import functools
+import math
+
+# 메타 정보가 없는 심볼에 쓰는 기본값
+DEFAULT_QTY_STEP = 1
+DEFAULT_MIN_QTY = 1
+DEFAULT_MAX_QTY = 710000
+DEFAULT_MAX_MKT_QTY = 71000
+DEFAULT_TICK_SIZE = 0.01
+
+# 이 범위 안에서는 float 곱셈/나눗셈 오차가 1e-6 보다 작아서, 정수 경계에서 1e-6 이상 떨어진 값은
+# float 결과로 바로 내림/반올림해도 정수 연산 결과와 같음. 경계 근처나 범위 밖이면 정수 연산으로 처리
+FAST_PATH_LIMIT = 2 ** 32
+FAST_PATH_MARGIN = 1e-6
+
+# 수량/가격 정수 양자화: 스텝/틱/최소·최대 수량을 10^precision 스케일 정수로 미리 계산해두고
+# 주문시에는 float 의 정확한 분수값(as_integer_ratio)으로 정수 연산만 수행
+# (0.3 // 0.1 == 2.0 같은 float 나눗셈 오차 없음)
+
+@functools.lru_cache(maxsize=None)
+def get_precision_from_step(step):
+    try:
+        return max(0, -decimal.Decimal(str(step)).normalize().as_tuple().exponent)
+    except Exception:
+        return 0
+
+def to_scaled_units(value, scale):
+    return int(decimal.Decimal(str(value)) * scale)
+
+def units_format(precision):
+    # 0 이상의 정수 단위를 (정수부, 소수부) 로 나눠 찍는 % 포맷
+    return '%d' if precision == 0 else f'%d.%0{precision}d'
+
+def float_format(precision):
+    # units < FAST_PATH_LIMIT 이면 units / scale 은 그 10진수에 가장 가까운 float 이고 ulp 가 10^-precision 보다
+    # 훨씬 작으므로, precision 자리로 찍으면 정확히 같은 문자열이 나옴 (divmod 포맷보다 빠름)
+    return f'%.{precision}f'
+
+def build_price_quantizer(tick):
+    price_precision = get_precision_from_step(tick)
+    price_scale = 10 ** price_precision
+    return {
+        'tick': float(tick),
+        'tick_units': max(1, to_scaled_units(tick, price_scale)),
+        'price_precision': price_precision,
+        'price_scale': price_scale,
+        'price_fmt': units_format(price_precision),
+        'price_ffmt': float_format(price_precision),
+    }
+
+def build_quantizer(step, min_qty, max_qty, max_mkt_qty, tick):
+    qty_precision = get_precision_from_step(step)
+    qty_scale = 10 ** qty_precision
+    step_units = max(1, to_scaled_units(step, qty_scale))
+    min_units = -(-to_scaled_units(min_qty, qty_scale) // step_units) * step_units
+    max_units = max(min_units, to_scaled_units(max_qty, qty_scale) // step_units * step_units)
+    max_mkt_units = max(min_units, to_scaled_units(max_mkt_qty, qty_scale) // step_units * step_units)
+    q = build_price_quantizer(tick)
+    q.update({
+        'step': float(step),
+        'step_units': step_units,
+        'min_units': min_units,
+        'max_units': max_units,
+        'max_mkt_units': max_mkt_units,
+        'qty_precision': qty_precision,
+        'qty_scale': qty_scale,
+        'qty_fmt': units_format(qty_precision),
+    })
+    # 단건 경로에서 딕셔너리 조회를 한번으로 줄이기 위한 묶음
+    q['qty_params'] = (
+        qty_scale, step_units, min_units, max_units, max_mkt_units,
+        qty_precision, q['qty_fmt'], float_format(qty_precision),
+    )
+    return q
+
+DEFAULT_QUANTIZER = build_quantizer(DEFAULT_QTY_STEP, DEFAULT_MIN_QTY, DEFAULT_MAX_QTY, DEFAULT_MAX_MKT_QTY, DEFAULT_TICK_SIZE)
+
+@functools.lru_cache(maxsize=256)
+def get_tick_quantizer(tick):
+    return build_price_quantizer(tick)
+
+def format_units(units, precision, scale):
+    if precision == 0:
+        return str(units)
+    sign = '-' if units < 0 else ''
+    whole, frac = divmod(abs(units), scale)
+    return f"{sign}{whole}.{frac:0{precision}d}"
+
+def floor_scaled(value, scale):
+    # value 를 scale 정수 단위로 내림. value 가 어떤 k/scale 의 float 표현이면(0.3 → 3/10) k 를 그대로 쓰고,
+    # 아니면 float 의 정확한 값을 내림 (0.0019999999999999 → 1/1000)
+    x = value * scale
+    if -FAST_PATH_LIMIT < x < FAST_PATH_LIMIT:
+        nearest = round(x)
+        if nearest / scale == value:
+            return nearest
+        floor = math.floor(x)
+        if FAST_PATH_MARGIN < x - floor < 1 - FAST_PATH_MARGIN:
+            return floor
+    n, d = value.as_integer_ratio()
+    nearest = (2 * n * scale + d) // (2 * d)
+    if nearest / scale == value:
+        return nearest
+    return n * scale // d
+
+def quantize_qty_units(q, qty, order_type="Market"):
+    scale, step_units, min_units, max_units, max_mkt_units = q['qty_params'][:5]
+    units = floor_scaled(qty, scale) // step_units * step_units
+    hi = max_mkt_units if order_type == "Market" else max_units
+    if units < min_units:
+        return min_units
+    if units > hi:
+        return hi
+    return units
+
+def quantize_qty_str(q, qty, order_type="Market"):
+    # 단건용: 리스트를 만들지 않고 바로 주문용 문자열 반환. 거래소에서 받은 포지션 사이즈처럼
+    # 이미 스텝 위에 있는 값이 대부분이라 floor_scaled 의 첫 분기를 인라인으로 처리
+    scale, step_units, min_units, max_units, max_mkt_units, precision, fmt, ffmt = q['qty_params']
+    x = qty * scale
+    if -FAST_PATH_LIMIT < x < FAST_PATH_LIMIT:
+        units = round(x)
+        if units / scale != qty:
+            units = floor_scaled(qty, scale)
+    else:
+        units = floor_scaled(qty, scale)
+    if step_units != 1:
+        units = units // step_units * step_units
+    hi = max_mkt_units if order_type == "Market" else max_units
+    if units < min_units:
+        units = min_units
+    elif units > hi:
+        units = hi
+    if precision == 0:
+        return str(units)
+    if units < FAST_PATH_LIMIT:
+        return ffmt % (units / scale)
+    return fmt % divmod(units, scale)
+
+def qty_strs(q, qtys, order_type="Market"):
+    scale, step_units, min_units, max_units, max_mkt_units, precision, fmt, ffmt = q['qty_params']
+    hi = max_mkt_units if order_type == "Market" else max_units
+    out = []
+    for qty in qtys:
+        units = floor_scaled(qty, scale) // step_units * step_units
+        if units < min_units:
+            units = min_units
+        elif units > hi:
+            units = hi
+        if precision == 0:
+            out.append(str(units))
+        elif units < FAST_PATH_LIMIT:
+            out.append(ffmt % (units / scale))
+        else:
+            out.append(fmt % divmod(units, scale))
+    return out
+
+def price_ticks(q, price):
+    # 가장 가까운 틱 개수 (동률은 올림), float 의 정확한 값 기준
+    y = price / q['tick']
+    if -FAST_PATH_LIMIT < y < FAST_PATH_LIMIT:
+        floor = math.floor(y)
+        if abs(y - floor - 0.5) > FAST_PATH_MARGIN:
+            return floor + 1 if y - floor > 0.5 else floor
+    n, d = price.as_integer_ratio()
+    tick_units = q['tick_units']
+    return (2 * n * q['price_scale'] + d * tick_units) // (2 * d * tick_units)
+
+def price_strs(q, prices):
+    tick_units, precision, scale = q['tick_units'], q['price_precision'], q['price_scale']
+    fmt, ffmt = q['price_fmt'], q['price_ffmt']
+    out = []
+    for p in prices:
+        units = price_ticks(q, p) * tick_units
+        if units < 0:
+            out.append(format_units(units, precision, scale))
+        elif precision == 0:
+            out.append(str(units))
+        elif units < FAST_PATH_LIMIT:
+            out.append(ffmt % (units / scale))
+        else:
+            out.append(fmt % divmod(units, scale))
+    return out
@@ -0,0 +1,227 @@
+import bisect
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import traceback
+import uuid
+
+SHARD_VIRTUAL_NODES = 64
+SHARD_RESULT_TIMEOUT = 120
+
+# 멀티계정: BYBIT_ACCOUNTS='[{"name": "main", "api_key": "...", "api_secret": "..."}, ...]'
+# 미설정시 BYBIT_API_KEY/BYBIT_API_SECRET 단일 계정(default)으로 동작
+def load_accounts(raw, default_api_key=None, default_api_secret=None):
+    if not raw:
+        return [{'name': 'default', 'api_key': default_api_key, 'api_secret': default_api_secret}]
+    entries = json.loads(raw)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("BYBIT_ACCOUNTS must be a non-empty JSON list of accounts")
+    accounts = []
+    for i, a in enumerate(entries):
+        missing = [k for k in ('name', 'api_key', 'api_secret') if not isinstance(a, dict) or not a.get(k)]
+        if missing:
+            raise ValueError(f"BYBIT_ACCOUNTS[{i}] is missing: {', '.join(missing)}")
+        accounts.append({'name': str(a['name']), 'api_key': a['api_key'], 'api_secret': a['api_secret']})
+    names = [a['name'] for a in accounts]
+    if len(set(names)) != len(names):
+        raise ValueError(f"BYBIT_ACCOUNTS has duplicate account names: {names}")
+    return accounts
+
+def validate_shard_config(accounts, workers_per_account):
+    if len(accounts) > 1 and workers_per_account <= 0:
+        raise ValueError("BYBIT_ACCOUNTS lists several accounts; set SHARD_WORKERS_PER_ACCOUNT >= 1 to serve them")
+
+def shard_hash(key):
+    return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:16], 16)
+
+def build_hash_ring(num_workers, vnodes=SHARD_VIRTUAL_NODES):
+    ring = sorted(
+        (shard_hash(f"worker-{w}#{v}"), w)
+        for w in range(num_workers)
+        for v in range(vnodes)
+    )
+    return [h for h, _ in ring], [w for _, w in ring]
+
+def get_shard_index(ring, key):
+    hashes, workers = ring
+    pos = bisect.bisect(hashes, shard_hash(key)) % len(hashes)
+    return workers[pos]
+
+def shard_worker_main(shard_name, shard_idx, num_workers, vnodes, account, handler, init, key_func, job_queue, result_queue):
+    # 워커 프로세스 전용: 계정 키, 커넥션풀, 캐시, 모니터 스레드를 모두 프로세스 안에서 소유
+    ring = build_hash_ring(num_workers, vnodes)
+
+    def owns_symbol(symbol):
+        return get_shard_index(ring, key_func(symbol) if key_func else symbol) == shard_idx
+
+    print(f"[샤드 {shard_name}] 워커 시작 (pid:{os.getpid()})", flush=True)
+    if init is not None:
+        try:
+            init(account, owns_symbol)
+        except Exception:
+            print(f"[샤드 {shard_name}] 워커 초기화 오류", traceback.format_exc(), flush=True)
+
+    # 심볼마다 FIFO 큐 + 소비 스레드 1개: 같은 심볼 신호는 도착 순서대로 하나씩 처리
+    def run_symbol_jobs(jobs):
+        while True:
+            job_id, _, signal, symbol, data = jobs.get()
+            try:
+                result = handler(signal, symbol, data)
+            except Exception as e:
+                print(f"[샤드 {shard_name} ERROR]", traceback.format_exc(), flush=True)
+                result = {'error': str(e)}
+            result_queue.put((job_id, result))
+
+    symbol_queues = {}
+    while True:
+        job = job_queue.get()
+        if job is None:
+            break
+        jobs = symbol_queues.get(job[1])
+        if jobs is None:
+            jobs = symbol_queues[job[1]] = queue.Queue()
+            threading.Thread(target=run_symbol_jobs, args=(jobs,), daemon=True).start()
+        jobs.put(job)
+
+# 계정별 워커 프로세스 풀. 심볼은 계정마다 컨시스턴트 해시 링으로 워커에 고정됨.
+# handler(signal, symbol, data) 가 워커에서 주문을 처리하고, init(account, owns_symbol) 은
+# 워커 시작(재시작 포함)시 한번 호출됨. 둘 다 spawn 으로 넘기므로 모듈 최상위 함수여야 함.
+class ShardRouter:
+    def __init__(self, accounts, workers_per_account, handler, init=None, key_func=None,
+                 result_timeout=SHARD_RESULT_TIMEOUT, vnodes=SHARD_VIRTUAL_NODES):
+        self.accounts = {a['name']: a for a in accounts}
+        self.workers_per_account = workers_per_account
+        self.handler = handler
+        self.init = init
+        self.key_func = key_func
+        self.result_timeout = result_timeout
+        self.vnodes = vnodes
+        self.ring = build_hash_ring(workers_per_account, vnodes)
+        self.workers = {}
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.stopping = False
+        # Flask 서버 스레드가 떠 있는 상태에서 fork 하지 않도록 spawn 사용
+        self.ctx = multiprocessing.get_context('spawn')
+
+    def start(self):
+        with self.lock:
+            for name, account in self.accounts.items():
+                self.workers[name] = [self._spawn(account, i) for i in range(self.workers_per_account)]
+        print(f"[샤드] 계정 {len(self.accounts)}개 x 워커 {self.workers_per_account}개 시작", flush=True)
+        return self
+
+    def stop(self, timeout=5):
+        with self.lock:
+            self.stopping = True
+            workers = [w for ws in self.workers.values() for w in ws]
+        for w in workers:
+            w['queue'].put(None)
+        for w in workers:
+            w['proc'].join(timeout)
+            if w['proc'].is_alive():
+                w['proc'].terminate()
+
+    def shard_key(self, symbol):
+        return self.key_func(symbol) if self.key_func else symbol
+
+    def _spawn(self, account, idx):
+        # self.lock 을 잡은 상태에서 호출
+        name = f"{account['name']}-{idx}"
+        job_queue = self.ctx.Queue()
+        result_queue = self.ctx.Queue()
+        proc = self.ctx.Process(
+            target=shard_worker_main,
+            args=(name, idx, self.workers_per_account, self.vnodes, account,
+                  self.handler, self.init, self.key_func, job_queue, result_queue),
+            daemon=True
+        )
+        proc.start()
+        worker = {'name': name, 'account': account, 'idx': idx, 'proc': proc, 'queue': job_queue, 'results': result_queue}
+        threading.Thread(target=self._collect, args=(worker,), daemon=True).start()
+        return worker
+
+    def _live_worker(self, account_name, idx):
+        # self.lock 을 잡은 상태에서 호출. 죽은 워커는 새로 띄우고, 기존 작업 정리는 _collect 가 담당
+        worker = self.workers[account_name][idx]
+        if worker['proc'].is_alive() or self.stopping:
+            return worker
+        print(f"[샤드 {worker['name']}] 워커 종료 감지 (exitcode:{worker['proc'].exitcode}) → 재시작", flush=True)
+        worker = self._spawn(worker['account'], idx)
+        self.workers[account_name][idx] = worker
+        return worker
+
+    def _deliver(self, job_id, result):
+        with self.lock:
+            job = self.pending.get(job_id)
+            if job is not None and not job['event'].is_set():
+                job['result'] = result
+                job['event'].set()
+                return
+        print(f"[샤드] 응답 대기 종료 후 도착한 결과 (job:{job_id}): {result}", flush=True)
+
+    def _collect(self, worker):
+        # 워커별 결과 큐: 강제 종료된 워커가 공유 큐를 망가뜨리지 않도록 워커와 함께 버림
+        while True:
+            try:
+                job_id, result = worker['results'].get(timeout=1)
+            except queue.Empty:
+                if worker['proc'].is_alive():
+                    continue
+                break
+            except (EOFError, OSError):
+                break
+            self._deliver(job_id, result)
+        # 죽기 직전에 보낸 결과를 먼저 마저 받고 나서 남은 작업을 unknown 처리
+        while True:
+            try:
+                job_id, result = worker['results'].get(timeout=0.2)
+            except Exception:
+                break
+            self._deliver(job_id, result)
+        with self.lock:
+            lost = [job_id for job_id, job in self.pending.items()
+                    if job['worker'] is worker and not job['event'].is_set()]
+            for job_id in lost:
+                job = self.pending[job_id]
+                job['result'] = {
+                    'status': 'unknown',
+                    'job_id': job_id,
+                    'error': f"shard worker {worker['name']} died; order state unknown, check the exchange",
+                }
+                job['event'].set()
+            if self.stopping:
+                return
+            print(f"[샤드 {worker['name']}] 워커 종료 (exitcode:{worker['proc'].exitcode}), 미완료 작업 {len(lost)}건 unknown 처리", flush=True)
+            if self.workers[worker['account']['name']][worker['idx']] is worker:
+                self._live_worker(worker['account']['name'], worker['idx'])
+
+    def submit(self, account_name, signal, symbol, data):
+        key = self.shard_key(symbol)
+        idx = get_shard_index(self.ring, key)
+        job_id = uuid.uuid4().hex
+        job = {'job_id': job_id, 'event': threading.Event(), 'result': None, 'worker': None}
+        with self.lock:
+            worker = self._live_worker(account_name, idx)
+            job['worker'] = worker
+            self.pending[job_id] = job
+            worker['queue'].put((job_id, key, signal, symbol, data))
+        print(f"[샤드] {account_name}/{symbol} → 워커 {worker['name']} (job:{job_id})", flush=True)
+        return job
+
+    def wait(self, job):
+        try:
+            if not job['event'].wait(self.result_timeout):
+                # 워커에서 아직 실행될 수 있으므로 실패가 아니라 대기중(pending)으로 응답
+                print(f"[샤드] 응답 시간 초과, 작업은 워커에 남아있음 (job:{job['job_id']})", flush=True)
+                return {'status': 'pending', 'job_id': job['job_id'], 'message': 'order queued on shard worker, result not known yet'}
+            return job['result']
+        finally:
+            with self.lock:
+                self.pending.pop(job['job_id'], None)
+
+    def dispatch(self, account_name, signal, symbol, data):
+        return self.wait(self.submit(account_name, signal, symbol, data))
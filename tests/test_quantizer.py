@@ -0,0 +1,98 @@
+import random
+from decimal import Decimal, ROUND_FLOOR, ROUND_HALF_UP
+
+import pytest
+
+from quantizer import (
+    build_quantizer, get_tick_quantizer, quantize_qty_units, quantize_qty_str,
+    qty_strs, price_ticks, price_strs, get_precision_from_step,
+)
+
+STEPS = ['0.001', '0.01', '0.1', '1', '10', '0.5', '0.0001', '100']
+TICKS = ['0.01', '0.1', '0.5', '0.0001', '0.005', '1', '10', '0.00001']
+
+
+def ref_qty(qty, step, min_qty, max_qty):
+    # float 를 최단 10진수(repr)로 보고 Decimal 로 스텝 내림 후 최소/최대로 자름
+    step = Decimal(step)
+    lo = (Decimal(min_qty) / step).to_integral_value(rounding='ROUND_CEILING') * step
+    hi = (Decimal(max_qty) / step).to_integral_value(rounding=ROUND_FLOOR) * step
+    floored = (Decimal(repr(qty)) / step).to_integral_value(rounding=ROUND_FLOOR) * step
+    return max(lo, min(floored, max(lo, hi)))
+
+
+def ref_price(price, tick):
+    tick = Decimal(tick)
+    return (Decimal(price) / tick).to_integral_value(rounding=ROUND_HALF_UP) * tick
+
+
+def random_qtys(rng, step):
+    precision = get_precision_from_step(step)
+    for _ in range(300):
+        k = rng.randint(0, 10 ** 7)
+        yield float(Decimal(step) * k)                                 # 스텝 위의 값
+        yield float(Decimal(k) / 10 ** (precision + rng.randint(1, 4)))  # 스텝보다 잘게 쪼갠 10진수
+        yield rng.uniform(0, 10 ** rng.randint(0, 6))                  # 임의 float
+
+
+@pytest.mark.parametrize('step', STEPS)
+def test_qty_matches_decimal_reference(step):
+    rng = random.Random(step)
+    min_qty = str(Decimal(step) * rng.randint(1, 5))
+    max_qty = str(Decimal(step) * rng.randint(10 ** 5, 10 ** 8))
+    max_mkt_qty = str(Decimal(step) * rng.randint(10 ** 4, 10 ** 6))
+    q = build_quantizer(float(step), float(min_qty), float(max_qty), float(max_mkt_qty), 0.01)
+    qtys = list(random_qtys(rng, step))
+    for order_type, limit in (('Market', max_mkt_qty), ('Limit', max_qty)):
+        strs = qty_strs(q, qtys, order_type)
+        for qty, s in zip(qtys, strs):
+            expected = ref_qty(qty, step, min_qty, limit)
+            assert Decimal(s) == expected, (qty, step, s)
+            assert quantize_qty_str(q, qty, order_type) == s
+            assert quantize_qty_units(q, qty, order_type) == int(expected * q['qty_scale'])
+
+
+@pytest.mark.parametrize('tick', TICKS)
+def test_price_matches_decimal_reference(tick):
+    rng = random.Random(tick)
+    q = get_tick_quantizer(float(tick))
+    prices = [rng.uniform(0, 10 ** rng.randint(-3, 6)) for _ in range(1000)]
+    for price, s in zip(prices, price_strs(q, prices)):
+        expected = ref_price(price, tick)
+        assert Decimal(s) == expected, (price, tick, s)
+        assert price_ticks(q, price) * Decimal(tick) == expected
+
+
+@pytest.mark.parametrize('qty, step, expected', [
+    (0.3, 0.1, '0.3'),
+    (0.7, 0.1, '0.7'),
+    (0.0019999999999999, 0.001, '0.001'),
+    (12345.6, 10, '12340'),
+    (1.005, 0.001, '1.005'),
+    (5.0, 1.0, '5'),
+])
+def test_qty_regressions(qty, step, expected):
+    q = build_quantizer(step, step, 10 ** 6, 10 ** 6, 0.01)
+    assert qty_strs(q, [qty]) == [expected]
+    assert quantize_qty_str(q, qty) == expected
+
+
+def test_qty_clamps_to_limits():
+    q = build_quantizer(0.001, 0.001, 100, 10, 0.01)
+    assert qty_strs(q, [0.0, 50.0], 'Market') == ['0.001', '10.000']
+    assert qty_strs(q, [50.0, 1000.0], 'Limit') == ['50.000', '100.000']
+
+
+def test_precision_from_step():
+    assert [get_precision_from_step(s) for s in (1, 1.0, 10, 0.1, 0.001, 1e-05, '0.50')] == [0, 0, 0, 1, 3, 5, 1]
+
+
+@pytest.mark.parametrize('price, tick, expected', [
+    (0.125, 0.25, '0.25'),      # 정확한 동률은 올림
+    (0.3, 0.1, '0.3'),
+    (2.675, 0.01, '2.67'),      # float 2.675 는 2.67499... 이므로 내림
+    (-1.25, 0.5, '-1.0'),
+    (100001.0, 10, '100000'),
+])
+def test_price_regressions(price, tick, expected):
+    assert price_strs(get_tick_quantizer(tick), [price]) == [expected]
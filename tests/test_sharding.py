@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+
+import pytest
+
+from sharding import ShardRouter, build_hash_ring, get_shard_index, load_accounts, validate_shard_config
+
+ACCOUNT = {'name': 'main', 'api_key': 'k', 'api_secret': 's'}
+INIT_INFO = None
+
+
+# 워커 프로세스에서 실행되는 주문 처리 대역 (spawn 이라 모듈 최상위 함수여야 함)
+def echo_handler(signal, symbol, data):
+    time.sleep(data.get('sleep', 0))
+    if data.get('crash'):
+        os._exit(1)
+    if data.get('exit_after_reply'):
+        threading.Timer(0.05, os._exit, args=(1,)).start()
+    return {
+        'message': 'ok', 'symbol': symbol, 'seq': data.get('seq'),
+        'pid': os.getpid(), 'done': time.monotonic(), 'init': INIT_INFO,
+    }
+
+
+def record_init(account, owns_symbol):
+    global INIT_INFO
+    INIT_INFO = (account['name'], [s for s in ('BTCUSDT', 'ETHUSDT', 'DOGEUSDT', 'XRPUSDT') if owns_symbol(s)])
+
+
+def strip_perp(symbol):
+    return symbol.replace('.P', '')
+
+
+@pytest.fixture
+def make_router():
+    routers = []
+
+    def make(workers=1, **kwargs):
+        router = ShardRouter([ACCOUNT], workers, echo_handler, **kwargs).start()
+        routers.append(router)
+        return router
+
+    yield make
+    for router in routers:
+        router.stop()
+
+
+def test_load_accounts_default():
+    assert load_accounts(None, 'k', 's') == [{'name': 'default', 'api_key': 'k', 'api_secret': 's'}]
+
+
+def test_load_accounts_parses_list():
+    raw = '[{"name": "a", "api_key": "k1", "api_secret": "s1"}, {"name": 2, "api_key": "k2", "api_secret": "s2"}]'
+    assert [a['name'] for a in load_accounts(raw)] == ['a', '2']
+
+
+@pytest.mark.parametrize('raw, message', [
+    ('[]', 'non-empty'),
+    ('{"name": "a"}', 'non-empty'),
+    ('[{"name": "a", "api_key": "k"}]', 'BYBIT_ACCOUNTS[0] is missing: api_secret'),
+    ('["a"]', 'missing: name, api_key, api_secret'),
+    ('[{"name": "a", "api_key": "k", "api_secret": "s"}, {"name": "a", "api_key": "k", "api_secret": "s"}]', 'duplicate'),
+])
+def test_load_accounts_rejects_bad_config(raw, message):
+    with pytest.raises(ValueError, match=message.replace('[', r'\[').replace(']', r'\]')):
+        load_accounts(raw)
+
+
+def test_several_accounts_need_workers():
+    accounts = load_accounts('[{"name": "a", "api_key": "k", "api_secret": "s"}, {"name": "b", "api_key": "k", "api_secret": "s"}]')
+    with pytest.raises(ValueError, match='SHARD_WORKERS_PER_ACCOUNT'):
+        validate_shard_config(accounts, 0)
+    validate_shard_config(accounts, 1)
+    validate_shard_config(accounts[:1], 0)
+
+
+def test_ring_balance():
+    ring = build_hash_ring(8)
+    counts = [0] * 8
+    for i in range(20000):
+        counts[get_shard_index(ring, f"SYM{i}USDT")] += 1
+    mean = 20000 / 8
+    assert all(0.6 * mean < c < 1.4 * mean for c in counts), counts
+
+
+def test_ring_stable_when_worker_added():
+    old, new = build_hash_ring(4), build_hash_ring(5)
+    keys = [f"SYM{i}USDT" for i in range(20000)]
+    moved = [k for k in keys if get_shard_index(old, k) != get_shard_index(new, k)]
+    # 새 워커 몫(약 1/5)만 옮겨가고, 옮겨간 키는 모두 새 워커로 감
+    assert len(moved) < 0.3 * len(keys)
+    assert all(get_shard_index(new, k) == 4 for k in moved)
+
+
+def test_same_symbol_runs_in_arrival_order(make_router):
+    router = make_router()
+    # 먼저 온 작업일수록 오래 걸리게 해서, 순서가 보장되지 않으면 뒤 작업이 먼저 끝나도록 함
+    jobs = [router.submit('main', 'buy', 'BTCUSDT', {'seq': i, 'sleep': 0.05 * (8 - i)}) for i in range(8)]
+    other = router.submit('main', 'buy', 'ETHUSDT', {'seq': 'eth'})
+    results = [router.wait(job) for job in jobs]
+    assert [r['seq'] for r in results] == list(range(8))
+    done = [r['done'] for r in results]
+    assert done == sorted(done)
+    # 다른 심볼은 같은 워커 안에서도 기다리지 않음
+    assert router.wait(other)['done'] < done[0]
+
+
+def test_symbols_are_pinned_to_workers(make_router):
+    router = make_router(workers=3)
+    pids = {}
+    for sym in ('BTCUSDT', 'ETHUSDT', 'DOGEUSDT', 'XRPUSDT'):
+        for _ in range(2):
+            result = router.dispatch('main', 'buy', sym, {})
+            pids.setdefault(sym, set()).add(result['pid'])
+            assert result['pid'] == router.workers['main'][get_shard_index(router.ring, sym)]['proc'].pid
+    assert all(len(p) == 1 for p in pids.values())
+
+
+def test_key_func_and_init_see_the_same_ring(make_router):
+    router = make_router(workers=3, init=record_init, key_func=strip_perp)
+    for sym in ('BTCUSDT', 'ETHUSDT', 'DOGEUSDT', 'XRPUSDT'):
+        perp = router.dispatch('main', 'buy', sym + '.P', {})
+        assert perp['pid'] == router.dispatch('main', 'buy', sym, {})['pid']
+        # 워커 init 에 넘어간 owns_symbol 이 라우터의 배정과 일치
+        name, owned = perp['init']
+        assert name == 'main' and sym in owned
+
+
+def test_dead_worker_reports_unknown_and_restarts(make_router):
+    router = make_router()
+    old_pid = router.workers['main'][0]['proc'].pid
+    job = router.submit('main', 'buy', 'BTCUSDT', {'sleep': 10})
+    time.sleep(0.5)
+    router.workers['main'][0]['proc'].kill()
+    started = time.time()
+    result = router.wait(job)
+    assert result['status'] == 'unknown' and result['job_id'] == job['job_id']
+    assert time.time() - started < 5
+    result = router.dispatch('main', 'buy', 'BTCUSDT', {})
+    assert result['message'] == 'ok' and result['pid'] != old_pid
+
+
+def test_worker_crash_inside_handler_reports_unknown(make_router):
+    router = make_router()
+    assert router.dispatch('main', 'buy', 'BTCUSDT', {'crash': True})['status'] == 'unknown'
+    assert router.dispatch('main', 'buy', 'BTCUSDT', {})['message'] == 'ok'
+
+
+def test_result_sent_before_death_is_delivered(make_router):
+    router = make_router()
+    result = router.dispatch('main', 'buy', 'BTCUSDT', {'seq': 1, 'exit_after_reply': True})
+    assert result['message'] == 'ok' and result['seq'] == 1
+
+
+def test_timeout_returns_pending_and_job_still_runs(make_router):
+    router = make_router(result_timeout=0.3)
+    result = router.dispatch('main', 'buy', 'BTCUSDT', {'seq': 1, 'sleep': 1.0})
+    assert result['status'] == 'pending' and 'error' not in result and result['job_id']
+    # 같은 심볼의 다음 작업은 앞 작업이 끝난 뒤 실행됨
+    router.result_timeout = 5
+    assert router.dispatch('main', 'buy', 'BTCUSDT', {'seq': 2})['seq'] == 2